@@ -32,11 +32,58 @@ class Settings(BaseSettings):
         default="sentence-transformers/all-MiniLM-L6-v2",
         description="HuggingFace sentence-transformer model for embeddings",
     )
+    EMBEDDING_BATCH_SIZE: int = Field(
+        default=128,
+        ge=1,
+        le=4096,
+        description="Texts per forward pass at 256 tokens; shorter length buckets scale up",
+    )
+    EMBEDDING_ONNX_FILE: str = Field(
+        default="",
+        description=(
+            "Opt-in ONNX weights file (within the model repo) to run via ONNX Runtime, "
+            "e.g. onnx/model_qint8_avx512_vnni.onnx (AVX512-VNNI hosts only), "
+            "onnx/model_quint8_avx2.onnx (AVX2) or onnx/model_qint8_arm64.onnx (ARM). "
+            "Empty uses the FP32 PyTorch model. Requires the sentence-transformers[onnx] "
+            "extra (optimum + onnxruntime). Rebuild the index after changing it."
+        ),
+    )
 
     # ── RAG Tuning ──────────────────────────────────────────────────
     CHUNK_SIZE: int = Field(default=1000, ge=200, le=4000)
     CHUNK_OVERLAP: int = Field(default=200, ge=0, le=1000)
     TOP_K: int = Field(default=5, ge=1, le=20)
+    PDF_EXTRACT_WORKERS: int = Field(
+        default=os.cpu_count() or 1,
+        ge=1,
+        description="Worker processes used for PDF text extraction",
+    )
+    PDF_READ_AHEAD: int = Field(
+        default=16,
+        ge=1,
+        le=256,
+        description="PDF files read and extracted concurrently ahead of chunking",
+    )
+    INGEST_BATCH_SIZE: int = Field(
+        default=1024,
+        ge=1,
+        description="Chunks embedded and added to the index per mini-batch during ingestion",
+    )
+
+    # ── FAISS Index ─────────────────────────────────────────────────
+    FAISS_HNSW_M: int = Field(default=32, ge=4, le=128, description="HNSW graph neighbours per node")
+    FAISS_HNSW_EF_CONSTRUCTION: int = Field(default=200, ge=16, le=1024)
+    FAISS_HNSW_EF_SEARCH: int = Field(default=64, ge=16, le=1024)
+    FAISS_IVFPQ_THRESHOLD: int = Field(
+        default=100_000,
+        ge=10_000,
+        description="Chunk count above which an IVF-PQ index is built instead of HNSW",
+    )
+    FAISS_IVF_NPROBE: int = Field(default=16, ge=1, le=4096)
+    USE_GPU_FAISS: bool = Field(
+        default=False,
+        description="Train/build IVF-PQ indexes on GPU 0 (requires faiss-gpu)",
+    )
 
     # ── Paths ───────────────────────────────────────────────────────
     PDF_DIRECTORY: str = Field(
@@ -47,6 +94,10 @@ class Settings(BaseSettings):
         default=os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "faiss_index"),
         description="Directory to persist the FAISS index",
     )
+    PDF_TEXT_CACHE_DIR: str = Field(
+        default=os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "text_cache"),
+        description="Cache of extracted PDF text keyed by file content hash (empty to disable)",
+    )
     FEEDBACK_FILE: str = Field(
         default=os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "feedback.jsonl"),
         description="Path to store user feedback",
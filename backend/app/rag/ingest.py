@@ -9,17 +9,25 @@ Usage (from backend/ directory):
 
 from __future__ import annotations
 
+import gzip
+import hashlib
+import io
 import os
 import re
+import sqlite3
 import sys
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, TypeVar
 
 import faiss
 import numpy as np
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from loguru import logger
 from pypdf import PdfReader
+from pypdf import __version__ as _PYPDF_VERSION
 
 # Ensure the backend root is on sys.path when run as a script
 _BACKEND_ROOT = Path(__file__).resolve().parent.parent.parent
@@ -27,7 +35,7 @@ if str(_BACKEND_ROOT) not in sys.path:
     sys.path.insert(0, str(_BACKEND_ROOT))
 
 from app.config import settings
-from app.services.embedding_service import embedding_service
+from app.services.embedding_service import get_embedding_service
 
 # ── Filename convention ──────────────────────────────────────────────────
 # Expected filename format: <Law>__<Section>__<Category>.pdf
@@ -53,6 +61,17 @@ def _parse_filename_metadata(filepath: str) -> Dict[str, str]:
     }
 
 
+# ── Text-cleaning patterns (compiled once at import) ─────────────────────
+# Possessive quantifiers (*+, ++) are used wherever the next token can never be
+# whitespace/digits, so the engine doesn't backtrack through long whitespace runs.
+_RE_PAGE_OF = re.compile(r"\n\s*+Page\s++\d++\s*(of\s++\d++)?\s*\n", re.IGNORECASE)
+_RE_DASHED_PAGE = re.compile(r"\n\s*+-\s*+\d++\s*+-\s*\n")
+_RE_BLANK_LINES = re.compile(r"\n{3,}")
+# Equivalent to `[ \t]+` -> " ", but only matches runs that actually change
+# (2+ blanks or any tab), so single spaces between words aren't rewritten.
+_RE_SPACES = re.compile(r"[ \t]{2,}|\t")
+
+
 def _clean_text(text: str) -> str:
     """
     Clean extracted PDF text:
@@ -61,24 +80,115 @@ def _clean_text(text: str) -> str:
     - Normalise Unicode
     """
     # Remove common page-number patterns
-    text = re.sub(r"\n\s*Page\s+\d+\s*(of\s+\d+)?\s*\n", "\n", text, flags=re.IGNORECASE)
-    text = re.sub(r"\n\s*-\s*\d+\s*-\s*\n", "\n", text)
+    text = _RE_PAGE_OF.sub("\n", text)
+    text = _RE_DASHED_PAGE.sub("\n", text)
 
     # Collapse multiple blank lines
-    text = re.sub(r"\n{3,}", "\n\n", text)
+    text = _RE_BLANK_LINES.sub("\n\n", text)
 
     # Collapse spaces (but keep newlines)
-    text = re.sub(r"[ \t]+", " ", text)
+    text = _RE_SPACES.sub(" ", text)
 
     return text.strip()
 
 
-def load_pdfs(pdf_dir: str | None = None) -> List[Tuple[str, str]]:
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+def _ordered_submit(
+    executor: Executor,
+    fn: Callable[[_T], _R],
+    items: Iterable[_T],
+    window: int,
+) -> Iterator[Tuple[_T, Future[_R]]]:
     """
-    Load all PDFs from the given directory.
+    Submit `fn(item)` for each item, keeping at most `window` tasks in flight.
 
-    Returns:
-        List of (filepath, full_text) tuples.
+    Unlike Executor.map, inputs are submitted lazily, so memory stays bounded
+    by the window rather than the number of items. Futures are yielded in
+    input order.
+    """
+    remaining = iter(items)
+    in_flight = deque((item, executor.submit(fn, item)) for item in islice(remaining, window))
+    while in_flight:
+        item, future = in_flight.popleft()
+        for next_item in islice(remaining, 1):
+            in_flight.append((next_item, executor.submit(fn, next_item)))
+        yield item, future
+
+
+def _text_cache_file(pdf_bytes: bytes) -> Path | None:
+    """
+    Cache location for a PDF's raw extracted text, keyed by a BLAKE2b hash of
+    the file contents and the pypdf version (extraction output can change
+    between releases). Returns None when caching is disabled.
+    """
+    if not settings.PDF_TEXT_CACHE_DIR:
+        return None
+    digest = hashlib.blake2b(pdf_bytes, digest_size=16)
+    digest.update(_PYPDF_VERSION.encode())
+    return Path(settings.PDF_TEXT_CACHE_DIR) / f"{digest.hexdigest()}.txt.gz"
+
+
+def _extract_pdf_text(pdf_file: Path) -> str:
+    """
+    Read a single PDF and return its cleaned text. Runs in a worker process.
+
+    Raw extracted text is cached on disk, so unchanged PDFs skip pypdf
+    extraction on re-ingestion; cleaning is always re-applied. Cache failures
+    (unreadable/corrupt entries, unwritable cache dir) fall back to extraction
+    and never cost the document.
+    """
+    pdf_bytes = pdf_file.read_bytes()
+    cache_file = _text_cache_file(pdf_bytes)
+    if cache_file is not None and cache_file.exists():
+        try:
+            return _clean_text(gzip.decompress(cache_file.read_bytes()).decode("utf-8"))
+        except Exception as exc:  # any cache failure (I/O, zlib, decoding) falls back to extraction
+            logger.warning(
+                "Ignoring unreadable text cache {cache} for {file}: {err}",
+                cache=cache_file,
+                file=pdf_file.name,
+                err=exc,
+            )
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    pages_text = []
+    for page in reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            pages_text.append(page_text)
+    raw_text = "\n\n".join(pages_text)
+
+    if cache_file is not None:
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file.write_bytes(gzip.compress(raw_text.encode("utf-8"), compresslevel=6))
+            os.replace(tmp_file, cache_file)
+        except OSError as exc:
+            logger.warning(
+                "Could not write text cache for {file}: {err}", file=pdf_file.name, err=exc
+            )
+            try:
+                tmp_file.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    return _clean_text(raw_text)
+
+
+def load_pdfs(pdf_dir: str | None = None) -> Iterator[Tuple[str, str]]:
+    """
+    Load all PDFs from the given directory, one file at a time.
+
+    Text extraction is CPU-bound pure Python, so files are read and extracted
+    in parallel worker processes (settings.PDF_EXTRACT_WORKERS), with up to
+    settings.PDF_READ_AHEAD files in flight ahead of the consumer.
+
+    Yields:
+        (filepath, full_text) tuples.
     """
     pdf_dir = pdf_dir or settings.PDF_DIRECTORY
     pdf_path = Path(pdf_dir)
@@ -86,43 +196,39 @@ def load_pdfs(pdf_dir: str | None = None) -> List[Tuple[str, str]]:
     if not pdf_path.exists():
         logger.warning("PDF directory does not exist: {dir}. Creating it.", dir=pdf_dir)
         pdf_path.mkdir(parents=True, exist_ok=True)
-        return []
+        return
 
     pdf_files = sorted(pdf_path.glob("*.pdf"))
     if not pdf_files:
         logger.warning("No PDF files found in {dir}", dir=pdf_dir)
-        return []
-
-    results = []
-    for pdf_file in pdf_files:
-        try:
-            reader = PdfReader(str(pdf_file))
-            pages_text = []
-            for page in reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    pages_text.append(page_text)
-            full_text = "\n\n".join(pages_text)
-            cleaned = _clean_text(full_text)
-            if cleaned:
-                results.append((str(pdf_file), cleaned))
-                logger.info("Loaded PDF: {file} ({n} chars)", file=pdf_file.name, n=len(cleaned))
-            else:
-                logger.warning("PDF yielded no text: {file}", file=pdf_file.name)
-        except Exception as exc:
-            logger.error("Failed to load PDF {file}: {err}", file=pdf_file.name, err=exc)
+        return
 
-    return results
+    workers = min(settings.PDF_EXTRACT_WORKERS, len(pdf_files))
+    window = max(settings.PDF_READ_AHEAD, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for pdf_file, extraction in _ordered_submit(pool, _extract_pdf_text, pdf_files, window):
+            try:
+                cleaned = extraction.result()
+                if cleaned:
+                    logger.info("Loaded PDF: {file} ({n} chars)", file=pdf_file.name, n=len(cleaned))
+                    yield str(pdf_file), cleaned
+                else:
+                    logger.warning("PDF yielded no text: {file}", file=pdf_file.name)
+            except Exception as exc:
+                logger.error("Failed to load PDF {file}: {err}", file=pdf_file.name, err=exc)
 
 
 def chunk_documents(
-    documents: List[Tuple[str, str]],
-) -> Tuple[List[str], List[Dict[str, str]]]:
+    documents: Iterable[Tuple[str, str]],
+) -> Iterator[Tuple[str, Dict[str, str]]]:
     """
     Split documents into chunks and generate metadata for each chunk.
 
-    Returns:
-        (texts, metadatas) – parallel lists of chunk texts and their metadata dicts.
+    Documents are consumed lazily, so only one document's text is held at a time.
+    All chunks of a document share a single metadata dict; callers must not mutate it.
+
+    Yields:
+        (text, metadata) pairs – a chunk's text and its document's metadata dict.
     """
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=settings.CHUNK_SIZE,
@@ -131,69 +237,240 @@ def chunk_documents(
         length_function=len,
     )
 
-    all_texts: List[str] = []
-    all_metadatas: List[Dict[str, str]] = []
-
+    total = 0
     for filepath, text in documents:
         base_meta = _parse_filename_metadata(filepath)
         chunks = splitter.split_text(text)
         for chunk in chunks:
-            all_texts.append(chunk)
-            all_metadatas.append(base_meta.copy())
+            yield chunk, base_meta
+        total += len(chunks)
 
-    logger.info("Total chunks created: {n}", n=len(all_texts))
-    return all_texts, all_metadatas
+    logger.info("Total chunks created: {n}", n=total)
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most `size` items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+# PQ trains 256 centroids per sub-quantiser (8 bits); FAISS wants ~39 points per centroid.
+_MIN_IVFPQ_TRAINING_POINTS = 39 * 256
+
+
+def _use_ivfpq(num_vectors: int) -> bool:
+    """Whether a corpus of this size gets IVF-PQ (large, and enough points to train PQ)."""
+    return num_vectors > settings.FAISS_IVFPQ_THRESHOLD and num_vectors >= _MIN_IVFPQ_TRAINING_POINTS
+
+
+def _create_faiss_index(dimension: int, num_vectors: int) -> faiss.Index:
+    """
+    Create an empty FAISS index sized for the corpus.
+
+    Embeddings are L2-normalised, so inner product equals cosine similarity.
+    Uses HNSW (approximate, O(log N) queries) for typical corpora and switches
+    to IVF-PQ once the chunk count exceeds settings.FAISS_IVFPQ_THRESHOLD and
+    there are enough vectors to train the PQ codebooks.
+    """
+    if _use_ivfpq(num_vectors):
+        # ~39 training points per centroid keeps k-means well-conditioned
+        nlist = max(1, min(4096, num_vectors // 39))
+        m = 48 if dimension % 48 == 0 else 8
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+        index.nprobe = settings.FAISS_IVF_NPROBE
+        return index
+
+    index = faiss.IndexHNSWFlat(dimension, settings.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = settings.FAISS_HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+    return index
+
+
+# Chunk store: one `documents` row per PDF holding its metadata, and one `chunks`
+# row per indexed vector (keyed by the same int64 id used in FAISS) pointing at it.
+_META_FIELDS = ("law", "section", "category", "source")
+_CREATE_TABLES = """
+CREATE TABLE documents (
+    id       INTEGER PRIMARY KEY,
+    law      TEXT NOT NULL,
+    section  TEXT NOT NULL,
+    category TEXT NOT NULL,
+    source   TEXT NOT NULL UNIQUE
+);
+CREATE TABLE chunks (
+    id          INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents (id),
+    text        TEXT NOT NULL
+);
+"""
+
+
+def _chunk_id(text: str, meta: Dict[str, str]) -> int:
+    """
+    Stable int64 id for a chunk: a hash of its source file and text.
+
+    Re-ingesting the same PDF yields the same ids, and repeated chunks within a
+    file collapse to one entry, while identical text in different laws stays distinct.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(meta["source"].encode())
+    digest.update(b"\0")
+    digest.update(text.encode())
+    return int.from_bytes(digest.digest(), "little", signed=True)
+
+
+def _gpu_resources() -> faiss.StandardGpuResources | None:
+    """Return FAISS GPU resources if USE_GPU_FAISS is enabled and a GPU is usable."""
+    if not settings.USE_GPU_FAISS:
+        return None
+    if not hasattr(faiss, "StandardGpuResources") or faiss.get_num_gpus() == 0:
+        logger.warning("USE_GPU_FAISS is set but no FAISS GPU is available; building on CPU.")
+        return None
+    return faiss.StandardGpuResources()
+
+
+def _rebuild_as_ivfpq(
+    index: faiss.IndexIDMap2,
+) -> Tuple[faiss.IndexIDMap2, faiss.StandardGpuResources | None]:
+    """
+    Rebuild a streamed HNSW index as IVF-PQ once the corpus crosses the threshold.
+
+    Vectors and ids are recovered from the HNSW flat storage, used to train the
+    IVF-PQ codebooks and re-added. k-means training and PQ encoding dominate
+    here, so the new index lives on GPU when USE_GPU_FAISS is enabled; the GPU
+    resources are returned so they outlive the index.
+    """
+    hnsw = faiss.downcast_index(index.index)
+    vectors = hnsw.reconstruct_n(0, hnsw.ntotal)
+    ids = faiss.vector_to_array(index.id_map)
+
+    base = _create_faiss_index(index.d, hnsw.ntotal)
+    gpu_res = _gpu_resources()
+    if gpu_res is not None:
+        base = faiss.index_cpu_to_gpu(gpu_res, 0, base)
+    rebuilt = faiss.IndexIDMap2(base)
+    rebuilt.train(vectors)
+    rebuilt.add_with_ids(vectors, ids)
+    logger.info("Corpus crossed {n} chunks; rebuilt index as IVF-PQ.", n=settings.FAISS_IVFPQ_THRESHOLD)
+    return rebuilt, gpu_res
 
 
 def build_faiss_index(
-    texts: List[str],
-    metadatas: List[Dict[str, str]],
+    chunks: Iterable[Tuple[str, Dict[str, str]]],
     index_path: str | None = None,
-) -> None:
+) -> int:
     """
-    Generate embeddings and build a FAISS index, persisting it to disk.
+    Embed chunks in mini-batches and stream them into a FAISS index on disk.
+
+    Every chunk gets a stable int64 id (see _chunk_id); the FAISS index is an
+    IndexIDMap2 over those ids and each batch's texts and metadata are inserted
+    into SQLite under the same ids as soon as it is embedded, with each
+    document's metadata stored once and referenced by its chunks.
+    Each batch is added to an HNSW index as soon as it is embedded; if the
+    corpus crosses settings.FAISS_IVFPQ_THRESHOLD the index is rebuilt once as
+    IVF-PQ and streaming continues into that.
 
     Saves:
-        - index.faiss   – the FAISS flat index
-        - texts.npy     – numpy array of chunk texts
-        - metadatas.npy – numpy array of metadata dicts
+        - index.faiss – IndexIDMap2 over the FAISS HNSW / IVF-PQ index
+        - chunks.db   – SQLite `documents` (id, law, section, category, source)
+                        and `chunks` (id, document_id, text) tables
+
+    Returns:
+        Number of vectors indexed.
     """
     index_path = index_path or settings.FAISS_INDEX_PATH
     out_dir = Path(index_path)
     out_dir.mkdir(parents=True, exist_ok=True)
-
-    logger.info("Generating embeddings for {n} chunks...", n=len(texts))
-    embeddings = embedding_service.embed_texts(texts)
-    embeddings_np = np.array(embeddings, dtype="float32")
-
-    # Build FAISS index (Flat L2 — exact search, fine for < 100k chunks)
-    dimension = embeddings_np.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings_np)
+    chunks_file = out_dir / "chunks.db"
+    chunks_tmp = out_dir / "chunks.db.tmp"
+    chunks_tmp.unlink(missing_ok=True)
+
+    embedding_service = get_embedding_service()
+    index: faiss.IndexIDMap2 | None = None
+    batch_buffer: np.ndarray | None = None
+    seen_ids: set[int] = set()
+    document_ids: Dict[str, int] = {}
+    total = 0
+    is_ivfpq = False
+    gpu_res = None
+
+    db = sqlite3.connect(chunks_tmp)
+    try:
+        db.executescript(_CREATE_TABLES)
+        for batch in _batched(chunks, settings.INGEST_BATCH_SIZE):
+            rows = []
+            for text, meta in batch:
+                chunk_id = _chunk_id(text, meta)
+                if chunk_id in seen_ids:
+                    continue
+                seen_ids.add(chunk_id)
+                document_id = document_ids.get(meta["source"])
+                if document_id is None:
+                    document_id = document_ids[meta["source"]] = len(document_ids) + 1
+                    db.execute(
+                        "INSERT INTO documents VALUES (?, ?, ?, ?, ?)",
+                        (document_id, *(meta[name] for name in _META_FIELDS)),
+                    )
+                rows.append((chunk_id, document_id, text))
+            if not rows:
+                continue
+
+            ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+            texts = [row[2] for row in rows]
+            if index is None:
+                # First batch: its embeddings fix the dimension of the streamed HNSW index
+                embeddings_np = embedding_service.embed_texts(texts)
+                dimension = embeddings_np.shape[1]
+                index = faiss.IndexIDMap2(_create_faiss_index(dimension, 0))
+                # index.add copies the vectors, so one buffer is reused for every later batch
+                batch_buffer = np.empty((settings.INGEST_BATCH_SIZE, dimension), dtype=np.float32)
+            else:
+                embeddings_np = embedding_service.embed_texts(texts, out=batch_buffer[: len(texts)])
+            db.executemany("INSERT INTO chunks VALUES (?, ?, ?)", rows)
+            index.add_with_ids(embeddings_np, ids)
+            total += len(rows)
+
+            if not is_ivfpq and _use_ivfpq(total):
+                index, gpu_res = _rebuild_as_ivfpq(index)
+                is_ivfpq = True
+            logger.info("Embedded and indexed {n} chunks...", n=total)
+        db.commit()
+    finally:
+        db.close()
+
+    if index is None:
+        chunks_tmp.unlink()
+        return 0
 
     # Persist
-    faiss.write_index(index, str(out_dir / "index.faiss"))
-    np.save(str(out_dir / "texts.npy"), np.array(texts, dtype=object))
-    np.save(str(out_dir / "metadatas.npy"), np.array(metadatas, dtype=object))
+    if gpu_res is not None:
+        index = faiss.index_gpu_to_cpu(index)
+    # Both files are fully written before either replaces the live pair, so an
+    # interrupted run never leaves a new index alongside an old chunk store.
+    index_tmp = out_dir / "index.faiss.tmp"
+    faiss.write_index(index, str(index_tmp))
+    os.replace(chunks_tmp, chunks_file)
+    os.replace(index_tmp, out_dir / "index.faiss")
 
     logger.info(
         "FAISS index saved to {path} ({n} vectors, dim={d})",
         path=index_path,
         n=index.ntotal,
-        d=dimension,
+        d=index.d,
     )
+    return index.ntotal
 
 
 def run_ingestion(pdf_dir: str | None = None, index_path: str | None = None) -> None:
-    """End-to-end ingestion: load → chunk → embed → index."""
+    """End-to-end streaming ingestion: load → chunk → embed → index, one batch at a time."""
     logger.info("Starting PDF ingestion pipeline...")
     documents = load_pdfs(pdf_dir)
-    if not documents:
+    chunks = chunk_documents(documents)
+    if not build_faiss_index(chunks, index_path):
         logger.warning("No documents to ingest. Add PDFs to the data/pdfs/ directory.")
         return
-
-    texts, metadatas = chunk_documents(documents)
-    build_faiss_index(texts, metadatas, index_path)
     logger.info("Ingestion complete ✓")
 
 
@@ -7,16 +7,16 @@ to retrieve top-k relevant legal chunks for a given query.
 
 from __future__ import annotations
 
+import sqlite3
 import threading
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 import faiss
-import numpy as np
 from loguru import logger
 
 from app.config import settings
-from app.services.embedding_service import embedding_service
+from app.services.embedding_service import get_embedding_service
 
 
 class Retriever:
@@ -34,8 +34,7 @@ class Retriever:
                 if cls._instance is None:
                     cls._instance = super().__new__(cls)
                     cls._instance._index = None
-                    cls._instance._texts = None
-                    cls._instance._metadatas = None
+                    cls._instance._db = None
                     cls._instance._loaded = False
         return cls._instance
 
@@ -48,26 +47,31 @@ class Retriever:
         Load the FAISS index and associated data from disk.
 
         Args:
-            index_path: Directory containing index.faiss, texts.npy, metadatas.npy.
+            index_path: Directory containing index.faiss and chunks.db.
         """
         index_path = index_path or settings.FAISS_INDEX_PATH
         idx_dir = Path(index_path)
 
         index_file = idx_dir / "index.faiss"
-        texts_file = idx_dir / "texts.npy"
-        metadatas_file = idx_dir / "metadatas.npy"
-
-        if not index_file.exists():
-            logger.warning(
-                "FAISS index not found at {path}. Run the ingestion pipeline first: "
-                "python -m app.rag.ingest",
-                path=index_file,
-            )
-            return
+        chunks_file = idx_dir / "chunks.db"
+
+        for required in (index_file, chunks_file):
+            if not required.exists():
+                logger.warning(
+                    "FAISS index not found at {path}. Run the ingestion pipeline first: "
+                    "python -m app.rag.ingest",
+                    path=required,
+                )
+                return
 
         self._index = faiss.read_index(str(index_file))
-        self._texts = np.load(str(texts_file), allow_pickle=True)
-        self._metadatas = np.load(str(metadatas_file), allow_pickle=True)
+        self._configure_search(self._index)
+        # Read-only; chunk rows are looked up by FAISS id on the primary key
+        if self._db is not None:
+            self._db.close()
+        self._db = sqlite3.connect(
+            f"{chunks_file.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+        )
         self._loaded = True
 
         logger.info(
@@ -75,6 +79,16 @@ class Retriever:
             n=self._index.ntotal,
         )
 
+    @staticmethod
+    def _configure_search(index: faiss.Index) -> None:
+        """Apply query-time search parameters (efSearch / nprobe) to the index."""
+        if isinstance(index, faiss.IndexIDMap):
+            index = faiss.downcast_index(index.index)
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = settings.FAISS_HNSW_EF_SEARCH
+        elif isinstance(index, faiss.IndexIVF):
+            index.nprobe = settings.FAISS_IVF_NPROBE
+
     def retrieve(
         self,
         query: str,
@@ -94,7 +108,7 @@ class Retriever:
                 - section:  Section identifier
                 - source:   Source PDF filename
                 - category: Legal category
-                - score:    Similarity score (lower L2 distance = more similar)
+                - score:    Cosine similarity score (higher = more similar)
         """
         if not self._loaded or self._index is None:
             logger.warning("Index not loaded. Attempting to load now...")
@@ -106,25 +120,36 @@ class Retriever:
         top_k = top_k or settings.TOP_K
 
         # Embed the query
-        query_embedding = embedding_service.embed_query(query)
-        query_vector = np.array([query_embedding], dtype="float32")
+        query_vector = get_embedding_service().embed_query(query).reshape(1, -1)
 
         # Search FAISS
         distances, indices = self._index.search(query_vector, min(top_k, self._index.ntotal))
 
+        hits = [(float(dist), int(idx)) for dist, idx in zip(distances[0], indices[0]) if idx != -1]
+        placeholders = ",".join("?" * len(hits))
+        rows = {
+            row[0]: row
+            for row in self._db.execute(
+                "SELECT c.id, c.text, d.law, d.section, d.category, d.source "
+                "FROM chunks AS c JOIN documents AS d ON d.id = c.document_id "
+                f"WHERE c.id IN ({placeholders})",
+                [idx for _, idx in hits],
+            )
+        }
+
         results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx == -1:  # FAISS returns -1 for empty slots
+        for dist, idx in hits:
+            if idx not in rows:
                 continue
-            meta = self._metadatas[idx] if isinstance(self._metadatas[idx], dict) else {}
+            _, text, law, section, category, source = rows[idx]
             results.append(
                 {
-                    "text": str(self._texts[idx]),
-                    "law": meta.get("law", ""),
-                    "section": meta.get("section", ""),
-                    "source": meta.get("source", ""),
-                    "category": meta.get("category", ""),
-                    "score": float(dist),
+                    "text": text,
+                    "law": law,
+                    "section": section,
+                    "source": source,
+                    "category": category,
+                    "score": dist,
                 }
             )
 
@@ -2,19 +2,31 @@
 NyayaAI – Embedding Service
 =============================
 Singleton wrapper around a sentence-transformer model for generating embeddings.
-Uses all-MiniLM-L6-v2 (384-dimensional, fast, free).
+Uses all-MiniLM-L6-v2 (384-dimensional, fast, free). INT8-quantised ONNX weights
+can be enabled via settings.EMBEDDING_ONNX_FILE; FP32 PyTorch is the default.
 """
 
 from __future__ import annotations
 
 import threading
-from typing import List
+from functools import lru_cache
+from typing import Dict, List
 
+import numpy as np
+import torch
 from loguru import logger
 from sentence_transformers import SentenceTransformer
+from sentence_transformers.util import batch_to_device
 
 from app.config import settings
 
+# Token-length bucket upper bounds. Texts are grouped by tokenised length so
+# each batch pads to its bucket rather than to the longest text overall.
+_LENGTH_BUCKETS = (64, 128, 256, 512)
+# settings.EMBEDDING_BATCH_SIZE applies at this length; shorter buckets get
+# proportionally larger batches so each forward pass covers ~the same tokens.
+_REFERENCE_LENGTH = 256
+
 
 class EmbeddingService:
     """
@@ -38,33 +50,78 @@ class EmbeddingService:
         """Lazy-load the embedding model on first access."""
         if self._model is None:
             logger.info(
-                "Loading embedding model: {model}", model=settings.EMBEDDING_MODEL
+                "Loading embedding model: {model} ({file})",
+                model=settings.EMBEDDING_MODEL,
+                file=settings.EMBEDDING_ONNX_FILE or "PyTorch",
             )
-            self._model = SentenceTransformer(settings.EMBEDDING_MODEL)
+            if settings.EMBEDDING_ONNX_FILE:
+                # Quantised ONNX graph: faster on CPU, but the file must match the host ISA
+                self._model = SentenceTransformer(
+                    settings.EMBEDDING_MODEL,
+                    backend="onnx",
+                    model_kwargs={"file_name": settings.EMBEDDING_ONNX_FILE},
+                )
+            else:
+                self._model = SentenceTransformer(settings.EMBEDDING_MODEL)
             logger.info("Embedding model loaded successfully.")
         return self._model
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    def embed_texts(self, texts: List[str], out: np.ndarray | None = None) -> np.ndarray:
         """
         Generate embeddings for a batch of texts.
 
+        Texts are tokenised once, bucketed by token length, and fed to the model
+        in batches trimmed to their longest member, so padding stays within a
+        bucket. Results are scattered back into their original order.
+
         Args:
             texts: List of strings to embed.
+            out:   Optional preallocated C-contiguous float32 buffer of shape
+                   (len(texts), dim) to write into, e.g. a reused batch buffer.
 
         Returns:
-            List of embedding vectors (each is a list of floats).
+            C-contiguous float32 array of shape (len(texts), dim), L2-normalised
+            (`out` itself when given).
         """
+        shape = (len(texts), self.model.get_sentence_embedding_dimension())
+        if out is None:
+            embeddings = np.empty(shape, dtype=np.float32)
+        elif out.shape != shape or out.dtype != np.float32 or not out.flags.c_contiguous:
+            raise ValueError(f"out must be a C-contiguous float32 array of shape {shape}")
+        else:
+            embeddings = out
         if not texts:
-            return []
-        embeddings = self.model.encode(
-            texts,
-            show_progress_bar=False,
-            convert_to_numpy=True,
-            normalize_embeddings=True,
+            return embeddings
+
+        # Single tokenisation pass (same rules as encode()); batches are sliced from it
+        features = self.model.tokenize(texts)
+        lengths = features["attention_mask"].sum(dim=1).numpy()
+        order = np.argsort(lengths, kind="stable")
+        # Bucket index = first bound >= length; anything longer joins the last bucket
+        bucket_ids = np.minimum(
+            np.searchsorted(_LENGTH_BUCKETS, lengths[order]), len(_LENGTH_BUCKETS) - 1
         )
-        return embeddings.tolist()
 
-    def embed_query(self, query: str) -> List[float]:
+        for bucket_id, bound in enumerate(_LENGTH_BUCKETS):
+            members = order[bucket_ids == bucket_id]
+            batch_size = max(1, settings.EMBEDDING_BATCH_SIZE * _REFERENCE_LENGTH // bound)
+            for start in range(0, len(members), batch_size):
+                rows = members[start : start + batch_size]
+                embeddings[rows] = self._forward(features, rows, int(lengths[rows].max()))
+        return embeddings
+
+    def _forward(
+        self, features: Dict[str, torch.Tensor], rows: np.ndarray, max_length: int
+    ) -> np.ndarray:
+        """Run the model on the given rows of pre-tokenised features, trimmed to max_length."""
+        index = torch.from_numpy(rows)
+        batch = {key: value[index, :max_length] for key, value in features.items()}
+        batch = batch_to_device(batch, self.model.device)
+        with torch.inference_mode():
+            out = self.model(batch)["sentence_embedding"]
+        return torch.nn.functional.normalize(out.float(), p=2, dim=1).cpu().numpy()
+
+    def embed_query(self, query: str) -> np.ndarray:
         """
         Generate an embedding for a single query string.
 
@@ -72,10 +129,13 @@ class EmbeddingService:
             query: The query text to embed.
 
         Returns:
-            A single embedding vector as a list of floats.
+            A single float32 embedding vector of shape (dim,).
         """
         return self.embed_texts([query])[0]
 
 
-# ── Module-level convenience instance ────────────────────────────────────
-embedding_service = EmbeddingService()
+# ── Lazy accessor ────────────────────────────────────────────────────────
+@lru_cache(maxsize=1)
+def get_embedding_service() -> EmbeddingService:
+    """Return the shared EmbeddingService, creating it on first use rather than at import."""
+    return EmbeddingService()